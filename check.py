@@ -2,44 +2,158 @@
 # PDF アップロード→RAG（TF-IDF検索）→GPT-4系で評価/誤字脱字チェック
 # 結果と得点は CSV（data/history.csv）に追記して、[history]で閲覧可能
 
+import asyncio
+import hashlib
 import io
 import json
 import re
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime
 
-import pandas as pd
 import streamlit as st
 
+# 高速 JSON（未導入なら標準 json にフォールバック）
+try:
+    import orjson
+except Exception:
+    orjson = None
+
 from common import (
     extract_text_from_pdf,
     chunk_text_for_japanese,
     build_tfidf_index,
     retrieve_top_k,
+    trim_context_chunks,
     load_prompts,
-    call_openai_with_context,
-    append_history,
+    create_async_openai_client,
+    call_openai_with_context_async,
+    append_history_rows,
     guess_company_name_from_text,
     ensure_data_dirs,
-    parse_score_safely
+    parse_score_safely,
+    prune_llm_cache
 )
 
+# 【審査観点】ブロックと、その中の「- 技術面: ...」形式の観点行
+_REVIEW_SECTION_RE = re.compile(r"【審査観点[^】]*】\n(.*?)(?:\n\s*\n|\n【|$)", re.S)
+_AXIS_LINE_RE = re.compile(r"^\s*[-・]\s*([^:：\n]+)[:：]\s*\S.*$", re.M)
+# 観点行の中の「（0-10）」形式の小項目（配点の重みに使う）
+_RUBRIC_ITEM_RE = re.compile(r"[（(]\s*0\s*[-－〜~]\s*10\s*[)）]")
+
+# 観点ごとの JSON を束ねる際に連結するリスト項目
+_MERGED_LIST_KEYS = ["strengths", "weaknesses", "risks", "missing_items", "recommendations"]
+
+# 複数 PDF 一括実行時の同時実行数（PDF 解析スレッド / OpenAI 同時リクエスト）
+PDF_MAX_WORKERS = 4
+LLM_MAX_CONCURRENCY = 8
+
+# チャンク設定の既定値（アップロード直後の先行インデックス作成でも使う）
+DEFAULT_CHUNK_CHARS = 1200
+DEFAULT_OVERLAP = 200
+
+# PDF テキスト/インデックスのキャッシュ上限（サーバーのメモリに載せ続けないよう件数と保持時間を制限）
+INDEX_CACHE_MAX_ENTRIES = 32
+INDEX_CACHE_TTL_SEC = 3600
+
+# PDF 解析/インデックス作成用のバックグラウンドスレッド（全セッションで共有）
+_INDEX_EXECUTOR = ThreadPoolExecutor(max_workers=PDF_MAX_WORKERS)
+
+
+@st.cache_data(show_spinner=False, max_entries=INDEX_CACHE_MAX_ENTRIES, ttl=INDEX_CACHE_TTL_SEC)
+def _extract_text(pdf_sha1: str, _pdf_bytes: bytes) -> str:
+    """PDF のハッシュ単位でテキスト抽出をキャッシュ（_pdf_bytes はキャッシュキーに含めない）。"""
+    return extract_text_from_pdf(io.BytesIO(_pdf_bytes))
+
+
+@st.cache_resource(show_spinner=False, max_entries=INDEX_CACHE_MAX_ENTRIES, ttl=INDEX_CACHE_TTL_SEC)
+def _build_index(pdf_sha1: str, chunk_chars: int, overlap: int, _text: str):
+    """
+    チャンク化 + TF-IDF インデックスを (PDFハッシュ, チャンク設定) 単位でキャッシュ。
+    同じ PDF・同じ設定での再実行ではトークナイズ/ベクトル化をスキップする。
+    返り値: (chunks, vectorizer, matrix)
+    """
+    chunks = chunk_text_for_japanese(_text, max_chars=chunk_chars, overlap=overlap)
+    vectorizer, matrix = build_tfidf_index(chunks)
+    return chunks, vectorizer, matrix
+
+
+def _extract_and_index(pdf_bytes: bytes, settings: dict):
+    """
+    1ファイル分の テキスト抽出 → チャンク化/インデックス作成。スレッドから呼ばれる想定（st.* の表示はしない）。
+    返り値: (text, (chunks, vectorizer, matrix) or None)。テキストが空ならインデックスは None。
+    """
+    pdf_sha1 = hashlib.sha1(pdf_bytes).hexdigest()
+    text = _extract_text(pdf_sha1, pdf_bytes)
+    if not text or not text.strip():
+        return text, None
+    return text, _build_index(pdf_sha1, settings["chunk_chars"], settings["overlap"], text)
+
+
+def _submit_indexing(uploaded_files, settings: dict) -> list[Future]:
+    """
+    各 PDF の _extract_and_index をバックグラウンドで開始し、uploaded_files と同順の Future を返す。
+    (PDFハッシュ, チャンク設定) が同じ Future が session_state にあれば再利用する（失敗したものは投げ直す）。
+    今回使わない古い Future は cancel する。
+    """
+    known = st.session_state.get("index_futures", {})
+    live = {}
+    futures = []
+    for f in uploaded_files:
+        pdf_bytes = f.getvalue()
+        key = (hashlib.sha1(pdf_bytes).hexdigest(), settings["chunk_chars"], settings["overlap"])
+        fut = live.get(key) or known.get(key)
+        if fut is None or (fut.done() and fut.exception() is not None):
+            fut = _INDEX_EXECUTOR.submit(_extract_and_index, pdf_bytes, settings)
+        live[key] = fut
+        futures.append(fut)
+    # 設定変更などで不要になった古いジョブは取り消す（未着手ならキューから外れ、共有スレッドを塞がない）
+    for key, fut in known.items():
+        if key not in live:
+            fut.cancel()
+    st.session_state["index_futures"] = live
+    return futures
+
+
+def _prefetch_index():
+    """
+    アップロード/チャンク設定変更時のコールバック。
+    実行ボタンが押される前にインデックス作成を始めておき、ユーザーの操作中に計算を済ませる。
+    """
+    uploaded_files = st.session_state.get("pdf_uploader") or []
+    if not uploaded_files:
+        for fut in st.session_state.get("index_futures", {}).values():
+            fut.cancel()
+        st.session_state["index_futures"] = {}
+        return
+    settings = {
+        "chunk_chars": st.session_state.get("chunk_chars", DEFAULT_CHUNK_CHARS),
+        "overlap": st.session_state.get("overlap", DEFAULT_OVERLAP),
+    }
+    _submit_indexing(uploaded_files, settings)
+
 
 def _render_settings_box():
     """チェックの共通設定 UI。返り値は辞書。"""
     with st.expander("⚙️ 高度な設定（必要な場合のみ）", expanded=False):
         top_k = st.slider("コンテキストとして LLM に渡すチャンク数（Top-K）", 3, 12, 6)
-        chunk_chars = st.slider("チャンク最大文字数", 500, 2000, 1200, step=100)
-        overlap = st.slider("チャンクのオーバーラップ文字数", 0, 600, 200, step=50)
+        chunk_chars = st.slider("チャンク最大文字数", 500, 2000, DEFAULT_CHUNK_CHARS, step=100,
+                                key="chunk_chars", on_change=_prefetch_index)
+        overlap = st.slider("チャンクのオーバーラップ文字数", 0, 600, DEFAULT_OVERLAP, step=50,
+                            key="overlap", on_change=_prefetch_index)
+        max_context_chars = st.slider("LLM に渡すコンテキストの上限文字数", 2000, 12000, 6000, step=500)
         model = st.text_input("使用モデル（空欄でデフォルト）", value="")
+        refresh = st.checkbox("キャッシュを使わずに再評価する（前回と同じ PDF・設定でも API を呼び直す）", value=False)
     return {
         "top_k": top_k,
         "chunk_chars": chunk_chars,
         "overlap": overlap,
+        "max_context_chars": max_context_chars,
+        "use_cache": not refresh,
         "model": model.strip() or None
     }
 
 
-def _render_result_box(title: str, content: str, parsed_json: dict | None):
+def _render_result_box(title: str, content: str, parsed_json: dict | list | None):
     """LLM の出力を表示。JSONに見えれば展開、無理なら原文表示。"""
     st.subheader(title)
     col1, col2 = st.columns([2, 1])
@@ -54,11 +168,183 @@ def _render_result_box(title: str, content: str, parsed_json: dict | None):
 
     with col2:
         # スコア抽出の試行（審査項目モードを想定）
-        score = parse_score_safely(parsed_json or content)
+        # dict 以外（トップレベルが配列の JSON など）は原文から探す
+        score = parse_score_safely(parsed_json) if isinstance(parsed_json, dict) else parse_score_safely(content)
         st.metric("抽出スコア（推定）", value="-" if score is None else f"{score} 点")
         return score
 
 
+def _split_review_axes(task_prompt: str) -> list[tuple[str, str]]:
+    """プロンプト中の【審査観点】を観点ごとに分割。[(観点名, 観点行), ...] を返す（無ければ空）。"""
+    m = _REVIEW_SECTION_RE.search(task_prompt)
+    if not m:
+        return []
+    return [(a.group(1).strip(), a.group(0).strip()) for a in _AXIS_LINE_RE.finditer(m.group(1))]
+
+
+def _axis_task_prompt(task_prompt: str, axis_line: str) -> str:
+    """全体プロンプトに「今回評価する観点」を追記した観点別タスク。"""
+    return (
+        f"{task_prompt}\n\n"
+        "【今回の評価対象】\n"
+        f"{axis_line}\n"
+        "上記の観点に絞って評価し、score はこの観点の達成度を 0-100 点に換算して返してください。"
+    )
+
+
+def _parse_json_safely(text: str | None) -> dict | list | None:
+    if not text:
+        return None
+    # 先頭が { / [ でなければ JSON ではない（自由記述の応答で例外を投げさせない）
+    s = text.lstrip()
+    if not s or s[0] not in "{[":
+        return None
+    try:
+        return orjson.loads(s) if orjson is not None else json.loads(s)
+    except Exception:
+        return None
+
+
+def _dump_json(obj) -> str:
+    """ダウンロード用の整形 JSON（日本語はエスケープしない）。"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, indent=2)
+
+
+def _axis_weight(axis_line: str) -> int:
+    """観点の配点の重み＝観点行に含まれる「（0-10）」小項目の数（無ければ1）。"""
+    return max(len(_RUBRIC_ITEM_RE.findall(axis_line)), 1)
+
+
+def _merge_axis_results(axes: list[tuple[str, str]], texts: list[str | None]) -> tuple[str | None, dict]:
+    """
+    観点別の LLM 出力を1つにまとめる。
+    - 原文は観点見出し付きで連結
+    - score は観点別スコアを配点（小項目数）で加重平均。1つでもスコアが取れない観点があれば None
+    - JSON として読めない観点は、原文とテキストから拾ったスコアを axes に残す
+    - summary は観点別に連結、リスト項目は重複を除いて連結
+    """
+    merged_text = "\n\n".join(f"## {name}\n{t}" for (name, _), t in zip(axes, texts) if t) or None
+
+    axis_results = {}
+    parsed = []
+    weighted = []
+    missing = []
+    for (name, axis_line), t in zip(axes, texts):
+        obj = _parse_json_safely(t)
+        if isinstance(obj, dict):
+            parsed.append((name, obj))
+            axis_results[name] = obj
+            score = parse_score_safely(obj)
+        else:
+            score = parse_score_safely(t) if t else None
+            axis_results[name] = {"score": score, "raw": t or "(出力なし)"}
+        if score is None:
+            missing.append(name)
+        else:
+            weighted.append((score, _axis_weight(axis_line)))
+
+    parsed_names = {name for name, _ in parsed}
+    summaries = []
+    for name, _ in axes:
+        if name in parsed_names:
+            summaries.append(f"【{name}】{axis_results[name].get('summary', '')}")
+        else:
+            summaries.append(f"【{name}】（JSON で受け取れませんでした。axes の raw を参照）")
+
+    total_weight = sum(w for _, w in weighted)
+    merged = {
+        "score": round(sum(sc * w for sc, w in weighted) / total_weight) if weighted and not missing else None,
+        "summary": "\n".join(summaries),
+    }
+    if missing:
+        merged["missing_scores"] = missing
+    for key in _MERGED_LIST_KEYS:
+        items = []
+        for _, obj in parsed:
+            values = obj.get(key)
+            for item in values if isinstance(values, list) else []:
+                if item not in items:
+                    items.append(item)
+        merged[key] = items
+    merged["axes"] = axis_results
+    return merged_text, merged
+
+
+def _retrieve_context(query: str, doc: dict, settings: dict) -> tuple[list[int], list[str]]:
+    """
+    Top-K 検索し、LLM に渡す形（文字数予算で切り詰め・打ち切り済み）にして返す。
+    参照抜粋の表示もこの結果を使うので、画面と実際の入力が一致する。
+    """
+    top_idx, top_chunks = retrieve_top_k(query, doc["vectorizer"], doc["matrix"], doc["chunks"], k=settings["top_k"])
+    trimmed = trim_context_chunks(top_chunks, settings["max_context_chars"])
+    return top_idx[:len(trimmed)], trimmed
+
+
+async def _call_llm_batch_async(client, system_prompt: str, jobs: list[tuple[str, list[str]]],
+                                model_override: str | None, max_context_chars: int, use_cache: bool = True,
+                                max_concurrency: int = LLM_MAX_CONCURRENCY) -> list[str | None]:
+    """
+    (タスクプロンプト, コンテキスト) の組を asyncio.gather で同時実行（待ち時間は最も遅い1件分）。
+    Semaphore で同時リクエスト数を絞り、OpenAI のレート制限を超えないようにする。
+    """
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def _one(task_prompt: str, context_chunks: list[str]) -> str | None:
+        async with sem:
+            return await call_openai_with_context_async(
+                client, system_prompt, task_prompt, context_chunks, model_override, max_context_chars,
+                use_cache=use_cache
+            )
+
+    async with client:
+        return await asyncio.gather(*[_one(tp, ctx) for tp, ctx in jobs])
+
+
+def _render_document_result(doc: dict, axes: list[tuple[str, str]], texts: list[str | None],
+                            title: str, mode: str, timestamp: str, key: str, file_suffix: str = ""):
+    """1ファイル分の結果表示（スコア・参照抜粋・ダウンロード）。抽出スコアを返す。"""
+    if len(axes) > 1:
+        llm_text, parsed_json = _merge_axis_results(axes, texts)
+    else:
+        llm_text = texts[0]
+        parsed_json = _parse_json_safely(llm_text)
+
+    score = _render_result_box(title, llm_text or "(出力なし)", parsed_json)
+    if len(axes) > 1:
+        st.caption(
+            "※ 審査観点ごとに評価し、総合スコアは観点別スコア（0-100）を配点（小項目数: "
+            + "、".join(f"{name}={_axis_weight(line)}" for name, line in axes)
+            + "）で加重平均した値です。"
+        )
+        if parsed_json.get("missing_scores"):
+            st.warning(
+                "次の観点のスコアを取得できなかったため、総合スコアは算出していません: "
+                + "、".join(parsed_json["missing_scores"])
+            )
+
+    # 参照した抜粋（人間の根拠確認用）
+    with st.expander("🔍 LLM に渡した参照抜粋（Top-K）", expanded=False):
+        st.caption("LLM に実際に渡した内容です（上限文字数に合わせて切り詰め・打ち切り済み）。")
+        for (name, _), (top_chunks_idx, top_chunks) in zip(axes, doc["retrieved"]):
+            if len(axes) > 1:
+                st.markdown(f"#### {name}")
+            for i, (idx, ch) in enumerate(zip(top_chunks_idx, top_chunks), start=1):
+                st.markdown(f"**[{i}] チャンク #{idx}**")
+                st.write(ch)
+
+    # ダウンロード用（JSON/Markdown）
+    st.download_button(
+        "📥 解析結果（JSON or 原文）を保存",
+        data=(_dump_json(parsed_json) if parsed_json else (llm_text or "")),
+        file_name=f"analysis_{mode}_{timestamp.replace(' ','_')}{file_suffix}.{'json' if parsed_json else 'txt'}",
+        mime="application/json" if parsed_json else "text/plain",
+        key=f"download_{key}"
+    )
+    return score
+
+
 def render():
     """チェック画面の描画（初期表示ページ）"""
     ensure_data_dirs()
@@ -72,11 +358,14 @@ def render():
         horizontal=True
     )
 
-    # PDF のアップローダ
-    uploaded = st.file_uploader("PDFファイルをアップロード（10〜20ページ想定）", type=["pdf"])
+    # PDF のアップローダ（複数ファイルをまとめてチェック可能）
+    uploaded_files = st.file_uploader(
+        "PDFファイルをアップロード（10〜20ページ想定・複数可）", type=["pdf"], accept_multiple_files=True,
+        key="pdf_uploader", on_change=_prefetch_index
+    )
 
     # 企業名（PDF から推定 or 手入力）
-    company_name = st.text_input("企業名（空欄ならPDFから自動推定を試行）", value="")
+    company_name = st.text_input("企業名（空欄ならPDFから自動推定を試行。複数ファイル時は各PDFから推定）", value="")
 
     # 設定
     settings = _render_settings_box()
@@ -88,33 +377,46 @@ def render():
         st.caption("※ PDF をアップロードし、ボタンを押すとチェックが始まります。")
         return
 
-    if not uploaded:
+    if not uploaded_files:
         st.error("PDF がアップロードされていません。先にファイルを選択してください。")
         return
 
-    # PDF → 全文テキスト抽出
-    with st.spinner("PDF を解析しています…"):
+    # PDF → 全文テキスト抽出 → チャンク化/TF-IDF インデックス作成
+    # （アップロード時に裏で開始済みなら、その結果を待つだけ。設定が変わっていれば作り直す）
+    # 完了したファイルから順に st.status へ書き出し、待ち時間中も進捗が見えるようにする
+    total = len(uploaded_files)
+    with st.status(f"PDF を解析し、RAG 用のインデックスを作成しています…（{total} 件）", expanded=True) as status:
+        futures = _submit_indexing(uploaded_files, settings)
+        names_by_future: dict[Future, list[str]] = {}
+        for f, fut in zip(uploaded_files, futures):
+            names_by_future.setdefault(fut, []).append(getattr(f, "name", "uploaded.pdf"))
+        done = 0
+        for fut in as_completed(names_by_future):
+            mark = "⚠️" if fut.exception() is not None or fut.result()[1] is None else "✅"
+            for filename in names_by_future[fut]:
+                done += 1
+                status.write(f"{mark} {filename}（{done}/{total}）")
+        status.update(label=f"PDF の解析が完了しました（{total} 件）", state="complete", expanded=False)
+
+    docs = []
+    for f, fut in zip(uploaded_files, futures):
+        filename = getattr(f, "name", "uploaded.pdf")
         try:
-            pdf_bytes = uploaded.read()
-            text = extract_text_from_pdf(io.BytesIO(pdf_bytes))
+            text, index = fut.result()
         except Exception as e:
-            st.error(f"PDF の読み込みでエラーが発生しました: {e}")
-            return
-
-    if not text or len(text.strip()) == 0:
-        st.error("PDF からテキストを抽出できませんでした（スキャンPDFの可能性）。OCRを通して再試行してください。")
+            st.error(f"{filename}: PDF の読み込みでエラーが発生しました: {e}")
+            continue
+        if index is None:
+            st.error(f"{filename}: PDF からテキストを抽出できませんでした（スキャンPDFの可能性）。OCRを通して再試行してください。")
+            continue
+        chunks, vectorizer, matrix = index
+        # 企業名の推定（手入力は単一ファイル時のみ使用）
+        name = company_name.strip() if len(uploaded_files) == 1 else ""
+        name = name or guess_company_name_from_text(text) or "（企業名不明）"
+        docs.append({"filename": filename, "company_name": name, "chunks": chunks, "vectorizer": vectorizer, "matrix": matrix})
+    if not docs:
         return
 
-    # 企業名の推定
-    if not company_name.strip():
-        company_name = guess_company_name_from_text(text) or "（企業名不明）"
-    st.write(f"推定企業名: **{company_name}**")
-
-    # チャンク化 → TF-IDF インデックス作成
-    with st.spinner("RAG 用のインデックスを作成しています…"):
-        chunks = chunk_text_for_japanese(text, max_chars=settings["chunk_chars"], overlap=settings["overlap"])
-        vectorizer, matrix = build_tfidf_index(chunks)
-
     # プロンプト取得
     prompts = load_prompts()
     if mode == "criteria":
@@ -134,55 +436,53 @@ def render():
             "出力は可能なら JSON 形式にしてください。"
         )
 
-    # RAG：プロンプトからクエリを作り、関連チャンクを検索
+    # RAG：審査観点ごとにクエリを作り、関連チャンクを検索
+    axes = _split_review_axes(task_prompt) if mode == "criteria" else []
+    if len(axes) > 1:
+        task_prompts = [_axis_task_prompt(task_prompt, axis_line) for _, axis_line in axes]
+    else:
+        # 観点が取れない場合はタスクプロンプトの冒頭300字を単一クエリとして使用
+        axes = [("全体", task_prompt[:300])]
+        task_prompts = [task_prompt]
     with st.spinner("関連する記述を検索しています…"):
-        # シンプルに「タスクプロンプトの冒頭300字」をクエリとして使用（実需なら観点ごとに複数クエリ推奨）
-        query = task_prompt[:300]
-        top_chunks_idx, top_chunks = retrieve_top_k(query, vectorizer, matrix, chunks, k=settings["top_k"])
-
-    # LLM 呼び出し
-    with st.spinner("LLM（GPT-4系）で評価しています…"):
-        llm_text = call_openai_with_context(
-            system_prompt=system_hint,
-            user_task_prompt=task_prompt,
-            context_chunks=top_chunks,
-            model_override=settings["model"]
-        )
-
-    # 出力の表示
-    parsed_json = None
-    if llm_text:
-        try:
-            parsed_json = json.loads(llm_text)
-        except Exception:
-            parsed_json = None
+        for doc in docs:
+            doc["retrieved"] = [_retrieve_context(query, doc, settings) for _, query in axes]
 
-    score = _render_result_box(title, llm_text or "(出力なし)", parsed_json)
-
-    # 参照した抜粋（人間の根拠確認用）
-    with st.expander("🔍 LLM に渡した参照抜粋（Top-K）", expanded=False):
-        for i, (idx, ch) in enumerate(zip(top_chunks_idx, top_chunks), start=1):
-            st.markdown(f"**[{i}] チャンク #{idx}**")
-            st.write(ch)
+    # LLM 呼び出し（全ファイル × 観点をまとめて並列）
+    jobs = [(tp, top_chunks) for doc in docs for tp, (_, top_chunks) in zip(task_prompts, doc["retrieved"])]
+    with st.spinner(f"LLM（GPT-4系）で評価しています…（{len(jobs)} リクエスト）"):
+        client = create_async_openai_client()
+        if client is None:
+            texts = [None] * len(jobs)
+        else:
+            texts = asyncio.run(_call_llm_batch_async(
+                client, system_hint, jobs, settings["model"], settings["max_context_chars"],
+                use_cache=settings["use_cache"]
+            ))
+            # 応答キャッシュの容量整理はバッチ完了後に1回だけ（イベントループ内では走らせない）
+            prune_llm_cache()
 
-    # 履歴 CSV への保存
+    # 出力の表示（ファイルごと）
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    append_history(
-        timestamp=timestamp,
-        company_name=company_name,
-        score=score if score is not None else "",
-        mode="審査項目" if mode == "criteria" else "誤字脱字",
-        filename=getattr(uploaded, "name", "uploaded.pdf")
-    )
-
-    # ダウンロード用（JSON/Markdown）
-    colA, colB = st.columns(2)
-    with colA:
-        st.download_button(
-            "📥 解析結果（JSON or 原文）を保存",
-            data=(json.dumps(parsed_json, ensure_ascii=False, indent=2) if parsed_json else (llm_text or "")),
-            file_name=f"analysis_{mode}_{timestamp.replace(' ','_')}.{'json' if parsed_json else 'txt'}",
-            mime="application/json" if parsed_json else "text/plain"
+    history_rows = []
+    for i, doc in enumerate(docs):
+        if len(docs) > 1:
+            st.markdown("---")
+            st.header(f"📄 {doc['filename']}")
+        st.write(f"推定企業名: **{doc['company_name']}**")
+        doc_texts = texts[i * len(axes):(i + 1) * len(axes)]
+        score = _render_document_result(
+            doc, axes, doc_texts, title, mode, timestamp,
+            key=str(i), file_suffix=f"_{i + 1}" if len(docs) > 1 else ""
         )
-    with colB:
-        st.success("履歴に記録しました。サイドバーの📜 履歴から一覧表示できます。")
+        history_rows.append([
+            timestamp,
+            doc["company_name"],
+            score if score is not None else "",
+            "審査項目" if mode == "criteria" else "誤字脱字",
+            doc["filename"]
+        ])
+
+    # 履歴 CSV への保存（全ファイル分を1回で追記）
+    append_history_rows(history_rows)
+    st.success("履歴に記録しました。サイドバーの📜 履歴から一覧表示できます。")
@@ -1,27 +1,73 @@
 # -*- coding: utf-8 -*-
 # アプリ全体で共有する関数群：入出力、RAG、LLM呼び出し、履歴保存など
 
+from __future__ import annotations
+
+import csv
+import functools
+import hashlib
+import io
+import itertools
 import json
 import os
 import re
+import tempfile
+import time
 from datetime import datetime
 from io import BytesIO
-from typing import List, Tuple
+from typing import TYPE_CHECKING, List, Tuple
 
-import pandas as pd
-from pypdf import PdfReader
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+if TYPE_CHECKING:
+    import pandas as pd
+    from sklearn.pipeline import Pipeline
 
 # import dotenv
 # dotenv.load_dotenv()
 api_key = os.environ.get("OPENAI_API_KEY", "")
 
-# OpenAI v1 クライアント
-try:
-    from openai import OpenAI
-except Exception:
-    OpenAI = None  # importエラーでもアプリは起動し、UIから注意喚起する
+
+# -----------------------------
+# 重いライブラリの遅延 import（使う関数の初回呼び出し時にだけ読み込む）
+# -----------------------------
+@functools.lru_cache(maxsize=1)
+def _pandas():
+    import pandas
+    return pandas
+
+
+@functools.lru_cache(maxsize=1)
+def _numpy():
+    import numpy
+    return numpy
+
+
+@functools.lru_cache(maxsize=1)
+def _pdf_reader_cls():
+    from pypdf import PdfReader
+    return PdfReader
+
+
+@functools.lru_cache(maxsize=1)
+def _tfidf_pipeline_factory():
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+    from sklearn.pipeline import make_pipeline
+    return HashingVectorizer, TfidfTransformer, make_pipeline
+
+
+@functools.lru_cache(maxsize=1)
+def _tenacity():
+    import tenacity
+    return tenacity
+
+
+@functools.lru_cache(maxsize=1)
+def _async_openai_cls():
+    """OpenAI v1 非同期クライアント。importエラーでもアプリは起動し、UIから注意喚起する。"""
+    try:
+        from openai import AsyncOpenAI
+    except Exception:
+        return None
+    return AsyncOpenAI
 
 
 # -----------------------------
@@ -39,6 +85,10 @@ def history_path() -> str:
     return os.path.join(data_dir(), "history.csv")
 
 
+def llm_cache_dir() -> str:
+    return os.path.join(data_dir(), "llm_cache")
+
+
 def ensure_data_dirs():
     os.makedirs(data_dir(), exist_ok=True)
     # プロンプト初期ファイルの用意
@@ -46,7 +96,8 @@ def ensure_data_dirs():
         save_prompts(default_prompts())
     # 履歴CSVの初期化
     if not os.path.exists(history_path()):
-        pd.DataFrame(columns=["timestamp", "company_name", "score", "mode", "filename"]).to_csv(history_path(), index=False)
+        with open(history_path(), "w", newline="", encoding="utf-8") as f:
+            csv.writer(f, lineterminator="\n").writerow(["timestamp", "company_name", "score", "mode", "filename"])
 
 
 # -----------------------------
@@ -96,10 +147,18 @@ def default_prompts() -> dict:
     }
 
 
+@functools.lru_cache(maxsize=4)
+def _load_prompts_cached(path: str, mtime_ns: int, size: int) -> dict:
+    """(パス, 更新時刻, サイズ) 単位で prompts.json の読み込み結果をキャッシュ。"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
 def load_prompts() -> dict:
+    """prompts.json は更新されたとき（mtime/サイズが変わったとき）だけ読み直す。"""
     try:
-        with open(prompts_path(), "r", encoding="utf-8") as f:
-            return json.load(f)
+        info = os.stat(prompts_path())
+        return dict(_load_prompts_cached(prompts_path(), info.st_mtime_ns, info.st_size))
     except Exception:
         return default_prompts()
 
@@ -112,27 +171,31 @@ def save_prompts(prompts: dict):
 # -----------------------------
 # 履歴 CSV
 # -----------------------------
-def append_history(timestamp: str, company_name: str, score, mode: str, filename: str):
-    """履歴CSVに1行追記（存在しなければヘッダ付きで作成）"""
+def append_history_rows(rows: List[list]):
+    """履歴CSVに複数行を1回の書き込みで追記（行は timestamp, company_name, score, mode, filename の順）。"""
     p = history_path()
-    row = {
-        "timestamp": timestamp,
-        "company_name": company_name,
-        "score": score,
-        "mode": mode,
-        "filename": filename
-    }
-    try:
-        df = pd.read_csv(p)
-    except Exception:
-        df = pd.DataFrame(columns=["timestamp", "company_name", "score", "mode", "filename"])
-    df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
-    df.to_csv(p, index=False)
+    is_new = not os.path.exists(p) or os.path.getsize(p) == 0
+    with open(p, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
+        if is_new:
+            writer.writerow(["timestamp", "company_name", "score", "mode", "filename"])
+        writer.writerows(rows)
 
 
 def load_history() -> pd.DataFrame:
+    """履歴CSVを pyarrow エンジン（マルチスレッドC++）で読み込み、Arrow 型の DataFrame を返す。"""
+    pd = _pandas()
     try:
-        return pd.read_csv(history_path())
+        # 列の型は推論に任せない（"123" のような社名や、全て空/数字のファイル名でも .str が使えるように）
+        return pd.read_csv(
+            history_path(), engine="pyarrow", dtype_backend="pyarrow",
+            dtype={
+                "company_name": "string[pyarrow]",
+                "score": "double[pyarrow]",
+                "mode": "string[pyarrow]",
+                "filename": "string[pyarrow]",
+            }
+        )
     except Exception:
         return pd.DataFrame(columns=["timestamp", "company_name", "score", "mode", "filename"])
 
@@ -141,10 +204,14 @@ def load_history() -> pd.DataFrame:
 # PDF → テキスト抽出
 # -----------------------------
 def extract_text_from_pdf(file_like: BytesIO) -> str:
-    """pypdf でシンプルにテキスト抽出（埋め込みテキストが無い場合は空文字）"""
+    """
+    pypdf でシンプルにテキスト抽出（埋め込みテキストが無い場合は空文字）。
+    ページの解析は pure Python で GIL を握るため、スレッド並列化はせず1つの PdfReader で順に処理する。
+    """
+    PdfReader = _pdf_reader_cls()
     reader = PdfReader(file_like)
     texts = []
-    for i, page in enumerate(reader.pages):
+    for page in reader.pages:
         try:
             t = page.extract_text() or ""
         except Exception:
@@ -153,21 +220,24 @@ def extract_text_from_pdf(file_like: BytesIO) -> str:
     return "\n".join(texts)
 
 
+# よくある法人表記パターン（上から順に試す）
+_COMPANY_PATTERNS = [re.compile(p) for p in (
+    r"(?:応募者|申請者)[:：]\s*([^\n]{2,30})",
+    r"(株式会社[^\s\n]{1,30})",
+    r"([^\s\n]{1,30}株式会社)",
+    r"(合同会社[^\s\n]{1,30})",
+)]
+_NAME_CLEAN_RE = re.compile(r"[。．,.、\s]+$")
+
+
 def guess_company_name_from_text(text: str) -> str | None:
     """簡易ルールで社名を推定（『株式会社〇〇』など）"""
-    # よくある法人表記パターンをいくつか試す
-    patterns = [
-        r"(?:応募者|申請者)[:：]\s*([^\n]{2,30})",
-        r"(株式会社[^\s\n]{1,30})",
-        r"([^\s\n]{1,30}株式会社)",
-        r"(合同会社[^\s\n]{1,30})",
-    ]
-    for pat in patterns:
-        m = re.search(pat, text)
+    for pat in _COMPANY_PATTERNS:
+        m = pat.search(text)
         if m:
             name = m.group(1).strip()
             # ノイズ除去（句読点など）
-            name = re.sub(r"[。．,.、\s]+$", "", name)
+            name = _NAME_CLEAN_RE.sub("", name)
             if 2 <= len(name) <= 40:
                 return name
     return None
@@ -176,114 +246,298 @@ def guess_company_name_from_text(text: str) -> str | None:
 # -----------------------------
 # チャンク化（日本語向け）
 # -----------------------------
+_SENTENCE_END_RE = re.compile(r"[。！？\n]")
+
+
 def chunk_text_for_japanese(text: str, max_chars: int = 1200, overlap: int = 200) -> List[str]:
     """
     日本語文の区切り（。！？\n）を活用して、指定長でチャンク化。
     overlap でチャンク間の重なりを持たせ、前後関係を多少維持する。
+    文字列の連結は行わず、元テキスト上のオフセットだけを動かしてスライスする。
     """
-    # 区切りで一次分割
-    # 句点・改行などを区切りとする
-    sentences = re.split(r"(。|！|？|\n)", text)
-    # sentences は ["文", "。", "文", "。", ...] の形になるので結合
-    units = []
-    buf = ""
-    for s in sentences:
-        if s in ["。", "！", "？", "\n"]:
-            buf += s
-            units.append(buf)
-            buf = ""
-        else:
-            buf += s
-    if buf.strip():
-        units.append(buf)
-
-    # 指定長でまとめる
+    # 句点・改行などの直後を文の終端オフセットとして収集
+    ends = [m.end() for m in _SENTENCE_END_RE.finditer(text)]
+    # 区切りで終わらない末尾の文（空白のみなら捨てる）
+    last = ends[-1] if ends else 0
+    if text[last:].strip():
+        ends.append(len(text))
+
+    # 指定長でまとめる（チャンクは常に text[start:prev] の連続区間）
     chunks = []
-    cur = ""
-    for u in units:
-        if len(cur) + len(u) <= max_chars:
-            cur += u
+    start = prev = 0
+    for end in ends:
+        if end - start <= max_chars:
+            prev = end
+            continue
+        piece = text[start:prev].strip()
+        if piece:
+            chunks.append(piece)
+        # overlap 分だけ末尾から残す
+        if overlap > 0 and prev - start > overlap:
+            start = prev - overlap
         else:
-            if cur.strip():
-                chunks.append(cur.strip())
-            # overlap 分だけ末尾から残す
-            if overlap > 0 and len(cur) > overlap:
-                cur = cur[-overlap:] + u
-            else:
-                cur = u
-    if cur.strip():
-        chunks.append(cur.strip())
+            start = prev
+        prev = end
+    piece = text[start:prev].strip()
+    if piece:
+        chunks.append(piece)
     return chunks
 
 
 # -----------------------------
 # TF-IDF 検索（ローカルRAG簡易版）
 # -----------------------------
-def build_tfidf_index(chunks: List[str]) -> Tuple[TfidfVectorizer, any]:
-    vectorizer = TfidfVectorizer(
-        analyzer="word",
-        token_pattern=r"(?u)\b\w+\b",
-        ngram_range=(1, 2),
-        max_features=50000
+def build_tfidf_index(chunks: List[str]) -> Tuple[Pipeline, any]:
+    HashingVectorizer, TfidfTransformer, make_pipeline = _tfidf_pipeline_factory()
+    # 語彙辞書を作らない HashingVectorizer で出現数を数え、TfidfTransformer で IDF 重み + L2 正規化
+    vectorizer = make_pipeline(
+        HashingVectorizer(
+            analyzer="word",
+            token_pattern=r"(?u)\b\w+\b",
+            ngram_range=(1, 2),
+            n_features=2 ** 18,
+            alternate_sign=False,
+            norm=None,
+            # 検索は順位付けだけなので float32 で十分（行列のメモリ量・積の転送量が半分）
+            dtype=_numpy().float32
+        ),
+        TfidfTransformer()
     )
     matrix = vectorizer.fit_transform(chunks)
     return vectorizer, matrix
 
 
-def retrieve_top_k(query: str, vectorizer: TfidfVectorizer, matrix, chunks: List[str], k: int = 6) -> Tuple[List[int], List[str]]:
+def retrieve_top_k(query: str, vectorizer: Pipeline, matrix, chunks: List[str], k: int = 6) -> Tuple[List[int], List[str]]:
     if not query.strip():
         return list(range(min(k, len(chunks)))), chunks[:k]
     qv = vectorizer.transform([query])
-    sims = cosine_similarity(qv, matrix)[0]
-    idx = sims.argsort()[::-1][:k]
-    return idx.tolist(), [chunks[i] for i in idx]
+    k = min(k, matrix.shape[0])
+    if k <= 0:
+        return [], []
+    # TF-IDF の各行は L2 正規化済み（norm="l2"）なので、内積がそのままコサイン類似度。
+    # 結果は疎行列のまま扱い、類似度が非ゼロのチャンクだけから上位 k 件を選ぶ（1×N の密配列を作らない）
+    np = _numpy()
+    sims = (qv @ matrix.T).tocsr()
+    nz_idx, nz_sims = sims.indices, sims.data
+    if len(nz_sims) > k:
+        top = np.argpartition(-nz_sims, k - 1)[:k]
+    else:
+        top = np.arange(len(nz_sims))
+    top = top[np.argsort(-nz_sims[top], kind="stable")]
+    idx = nz_idx[top].tolist()
+    # 一致するチャンクが k 件に満たない場合は、類似度0のチャンクを先頭から補う
+    if len(idx) < k:
+        hit = set(idx)
+        idx += list(itertools.islice((i for i in range(matrix.shape[0]) if i not in hit), k - len(idx)))
+    return idx, [chunks[i] for i in idx]
+
+
+# -----------------------------
+# LLM 応答キャッシュ（同一リクエストの再実行では API を呼ばない）
+# -----------------------------
+LLM_TEMPERATURE = 0.2
+LLM_CACHE_EXPIRE_SEC = 86400 * 30
+LLM_CACHE_MAX_BYTES = 1024 ** 3  # 1 GB を超えたら古いものから削除
+
+
+def _llm_cache_key(model: str, messages: List[dict]) -> str:
+    """モデル・メッセージ・温度を含むリクエスト全体の sha1。"""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "temperature": LLM_TEMPERATURE},
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _llm_cache_get(key: str) -> str | None:
+    p = os.path.join(llm_cache_dir(), f"{key}.json")
+    try:
+        if time.time() - os.path.getmtime(p) > LLM_CACHE_EXPIRE_SEC:
+            os.remove(p)  # 期限切れは削除して呼び直させる
+            return None
+        with open(p, "r", encoding="utf-8") as f:
+            return json.load(f)["content"]
+    except Exception:
+        return None
+
+
+def _llm_cache_set(key: str, content: str):
+    """一時ファイルに書いてから置き換える（並列書き込みでも壊れたファイルを残さない）。失敗は無視。"""
+    tmp_path = None
+    try:
+        os.makedirs(llm_cache_dir(), exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=llm_cache_dir(), suffix=".tmp", delete=False) as f:
+            tmp_path = f.name
+            json.dump({"content": content}, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(llm_cache_dir(), f"{key}.json"))
+    except Exception:
+        if tmp_path:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def prune_llm_cache(max_bytes: int = LLM_CACHE_MAX_BYTES):
+    """
+    キャッシュ全体が max_bytes を超えていれば、更新が古いファイルから削除する。
+    全ファイルを stat するので書き込みごとではなく、チェック実行（バッチ）ごとに1回だけ呼ぶ。
+    取り残された一時ファイル（1時間以上前の .tmp）もここで掃除する。
+    """
+    if not os.path.isdir(llm_cache_dir()):
+        return
+    now = time.time()
+    entries = []
+    with os.scandir(llm_cache_dir()) as it:
+        for e in it:
+            if not e.is_file():
+                continue
+            info = e.stat()
+            if e.name.endswith(".json"):
+                entries.append((info.st_mtime, info.st_size, e.path))
+            elif e.name.endswith(".tmp") and now - info.st_mtime > 3600:
+                try:
+                    os.remove(e.path)
+                except OSError:
+                    pass
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
 
 
 # -----------------------------
 # OpenAI 呼び出し（Chat Completions）
 # -----------------------------
-def call_openai_with_context(system_prompt: str, user_task_prompt: str, context_chunks: List[str], model_override: str | None = None) -> str | None:
+def trim_context_chunks(context_chunks: List[str], max_context_chars: int = 6000,
+                         top_chunk_chars: int = 2000, other_chunk_chars: int = 1000,
+                         min_chunk_chars: int | None = None) -> List[str]:
+    """
+    LLM に渡すコンテキストを文字数予算内に収める（入力トークン削減＝応答待ちの短縮）。
+    上位チャンクほど多く残し（1位 top_chunk_chars、2位以下 other_chunk_chars）、
+    超過分は末尾を「…」で切り詰め、合計が max_context_chars に達したら打ち切る。
+    残り予算が min_chunk_chars（既定 other_chunk_chars // 4）未満で、
+    チャンクが丸ごと収まらない場合は、断片だけを渡さずにそこで打ち切る。
+    """
+    if min_chunk_chars is None:
+        min_chunk_chars = other_chunk_chars // 4
+    trimmed = []
+    remaining = max_context_chars
+    for i, c in enumerate(context_chunks):
+        if remaining <= 0:
+            break
+        if trimmed and remaining < min_chunk_chars and len(c) > remaining:
+            break
+        limit = min(top_chunk_chars if i == 0 else other_chunk_chars, remaining)
+        if len(c) > limit:
+            c = c[:max(limit - 1, 0)] + "…"
+        trimmed.append(c)
+        remaining -= len(c)
+    return trimmed
+
+
+def _build_messages(system_prompt: str, user_task_prompt: str, context_chunks: List[str], max_context_chars: int = 6000) -> List[dict]:
+    """Context（Top-K 抜粋）を埋め込んだ Chat Completions 用メッセージを組み立てる。"""
+    # 呼び出し側で切り詰め済みでも結果は変わらない（同じ予算で再適用しても不変）
+    context_chunks = trim_context_chunks(context_chunks, max_context_chars)
+    # コンテキストの整形（識別可能な区切り付き）。中間リストを作らずバッファに直接書き込む
+    buf = io.StringIO()
+    for i, c in enumerate(context_chunks):
+        if i:
+            buf.write("\n\n---\n\n")
+        buf.write(f"[CONTEXT #{i+1}]\n")
+        buf.write(c)
+    context_text = buf.getvalue()
+    return [
+        {"role": "system", "content": system_prompt},
+        {
+            "role": "user",
+            "content": (
+                "次のコンテキスト（申請書の抜粋）に基づいてタスクを実施してください。\n"
+                "【重要】コンテキスト外の情報で断定せず、不明点は『不明』と記載。\n\n"
+                f"{context_text}\n\n"
+                "----\n"
+                f"【タスク】\n{user_task_prompt}"
+            )
+        }
+    ]
+
+
+def _resolve_model(model_override: str | None) -> str:
+    return model_override or os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
+
+
+def _is_transient_openai_error(e: BaseException) -> bool:
+    """レート制限・タイムアウト・接続断・5xx など、再試行で回復しうるエラーか。"""
+    try:
+        import openai
+    except Exception:
+        return False
+    return isinstance(e, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError))
+
+
+def _llm_retry_kwargs() -> dict:
+    """一時的なエラーは指数バックオフ（ジッター付き）で最大5回まで再試行し、それでも失敗したら元の例外を送出。"""
+    t = _tenacity()
+    return dict(
+        stop=t.stop_after_attempt(5),
+        wait=t.wait_random_exponential(min=1, max=20),
+        retry=t.retry_if_exception(_is_transient_openai_error),
+        reraise=True,
+    )
+
+
+async def _create_chat_completion_async(client, model: str, messages: List[dict]):
+    retrying = _tenacity().AsyncRetrying(**_llm_retry_kwargs())
+    return await retrying(client.chat.completions.create, model=model, messages=messages, temperature=LLM_TEMPERATURE)
+
+
+def create_async_openai_client():
     """
-    Context（Top-K 抜粋）を添えて ChatCompletion を実行。
-    APIキー未設定やエラー時は None を返す。
+    並列呼び出し用の AsyncOpenAI クライアントを生成。
+    APIキー未設定や import 失敗時は画面にエラーを出して None を返す（チェックは1回だけ行う）。
     """
     api_key = os.environ.get("OPENAI_API_KEY", "")
     if not api_key:
-        # Streamlit 側でユーザーに知らせる（raise はしない）
         import streamlit as st
         st.error("OPENAI_API_KEY が未設定です。環境変数に API キーを設定してください。")
         return None
 
-    if OpenAI is None:
+    AsyncOpenAI = _async_openai_cls()
+    if AsyncOpenAI is None:
         import streamlit as st
         st.error("`openai` パッケージの読み込みに失敗しました。`pip install openai` を実行してください。")
         return None
 
-    model = model_override or os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
+    # 再試行は _create_chat_completion_async 側で行うため、SDK 内蔵のリトライは無効化
+    return AsyncOpenAI(api_key=api_key, max_retries=0)
 
-    # コンテキストの整形（識別可能な区切り付き）
-    context_text = "\n\n---\n\n".join([f"[CONTEXT #{i+1}]\n{c}" for i, c in enumerate(context_chunks)])
 
-    client = OpenAI(api_key=api_key)
+async def call_openai_with_context_async(client, system_prompt: str, user_task_prompt: str, context_chunks: List[str], model_override: str | None = None,
+                                        max_context_chars: int = 6000, use_cache: bool = True) -> str | None:
+    """
+    Context（Top-K 抜粋）を添えて ChatCompletion を実行（asyncio.gather で複数観点/複数ファイルを同時に投げる）。
+    client は create_async_openai_client() の戻り値。エラー時は None を返す。
+    use_cache=False なら応答キャッシュを読まずに API を呼ぶ（結果は保存する）。
+    """
+    model = _resolve_model(model_override)
+    messages = _build_messages(system_prompt, user_task_prompt, context_chunks, max_context_chars)
+    cache_key = _llm_cache_key(model, messages)
+    cached = _llm_cache_get(cache_key) if use_cache else None
+    if cached is not None:
+        return cached
+
     try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {
-                    "role": "user",
-                    "content": (
-                        "次のコンテキスト（申請書の抜粋）に基づいてタスクを実施してください。\n"
-                        "【重要】コンテキスト外の情報で断定せず、不明点は『不明』と記載。\n\n"
-                        f"{context_text}\n\n"
-                        "----\n"
-                        f"【タスク】\n{user_task_prompt}"
-                    )
-                }
-            ],
-            temperature=0.2,
-        )
-        return resp.choices[0].message.content
+        resp = await _create_chat_completion_async(client, model, messages)
+        content = resp.choices[0].message.content
+        if content:
+            _llm_cache_set(cache_key, content)
+        return content
     except Exception as e:
         import streamlit as st
         st.error(f"OpenAI 呼び出しでエラー: {e}")
@@ -293,32 +547,48 @@ def call_openai_with_context(system_prompt: str, user_task_prompt: str, context_
 # -----------------------------
 # スコア抽出の安全化
 # -----------------------------
+_SCORE_JSON_RE = re.compile(r'"score"\s*:\s*(\d{1,3})')
+_SCORE_TEXT_RE = re.compile(r'(\d{1,3})\s*点')
+
+
+def _to_score(v) -> int | None:
+    try:
+        iv = int(v)
+    except Exception:
+        return None
+    return iv if 0 <= iv <= 100 else None
+
+
 def parse_score_safely(obj_or_text) -> int | None:
     """
     JSON / テキストから 0-100 の整数スコアを可能な限り抽出。
-    - JSONで "score" キーが整数ならそれを返す
+    - JSON（dict）なら "score" キー、無ければ1階層下（{"result": {"score": ...}} など）を直接参照
     - テキストなら 'score": 85' や '85点' などを探索
     """
-    # JSONの場合
+    # JSONの場合（シリアライズし直さず、キーを直接見る）
     if isinstance(obj_or_text, dict):
-        v = obj_or_text.get("score")
-        try:
-            iv = int(v)
-            if 0 <= iv <= 100:
-                return iv
-        except Exception:
-            pass
+        iv = _to_score(obj_or_text.get("score"))
+        if iv is not None:
+            return iv
+        for v in obj_or_text.values():
+            if isinstance(v, dict):
+                iv = _to_score(v.get("score"))
+                if iv is not None:
+                    return iv
+        return None
+
+    if not isinstance(obj_or_text, str):
+        return None
 
     # テキストの場合
-    text = obj_or_text if isinstance(obj_or_text, str) else json.dumps(obj_or_text, ensure_ascii=False)
     # 例: "score": 85
-    m = re.search(r'"score"\s*:\s*(\d{1,3})', text)
+    m = _SCORE_JSON_RE.search(obj_or_text)
     if m:
         iv = int(m.group(1))
         if 0 <= iv <= 100:
             return iv
     # 例: 85点
-    m2 = re.search(r'(\d{1,3})\s*点', text)
+    m2 = _SCORE_TEXT_RE.search(obj_or_text)
     if m2:
         iv = int(m2.group(1))
         if 0 <= iv <= 100:
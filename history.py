@@ -1,11 +1,14 @@
 # -*- coding: utf-8 -*-
 # CSV（data/history.csv）に蓄積したチェック履歴を一覧表示・簡易分析するページ
 
-import pandas as pd
 import streamlit as st
 from common import load_history, ensure_data_dirs
 
 def render():
+    # pandas / numpy は履歴ページを開いたときだけ読み込む（起動時の import を軽くする）
+    import numpy as np
+    import pandas as pd
+
     ensure_data_dirs()
     st.title("📜 チェック履歴")
 
@@ -26,20 +29,23 @@ def render():
     with col3:
         filename = st.text_input("ファイル名に含む文字（部分一致）", value="")
 
-    _df = df.copy()
+    # 条件を1つの bool マスクにまとめてから1回だけ抽出（全体コピーはしない）。
+    # Arrow 型の列は欠損との比較が <NA> になるため、False として扱う
+    mask = np.ones(len(df), dtype=bool)
     if sel_company != "（すべて）":
-        _df = _df[_df["company_name"] == sel_company]
+        mask &= (df["company_name"] == sel_company).to_numpy(dtype=bool, na_value=False)
     if sel_mode != "（すべて）":
-        _df = _df[_df["mode"] == sel_mode]
+        mask &= (df["mode"] == sel_mode).to_numpy(dtype=bool, na_value=False)
     if filename.strip():
-        _df = _df[_df["filename"].astype(str).str.contains(filename.strip(), na=False)]
+        mask &= df["filename"].str.contains(filename.strip(), regex=False).to_numpy(dtype=bool, na_value=False)
+    _df = df[mask]
 
     st.subheader("📄 履歴一覧")
     st.dataframe(_df, use_container_width=True, hide_index=True)
 
     # スコアの推移チャート（審査項目のみを対象）
     st.subheader("📈 スコア推移（審査項目のみ）")
-    df_score = df[df["mode"] == "審査項目"].copy()
+    df_score = df[(df["mode"] == "審査項目").fillna(False)].copy()
     try:
         df_score["score"] = pd.to_numeric(df_score["score"], errors="coerce")
         df_score = df_score.dropna(subset=["score"])